@@ -18,11 +18,9 @@ import displayio
 import gc
 import os
 import re
-import terminalio
 import time
-import vectorio
 import wifi
-from digitalio import DigitalInOut, Direction, Pull
+from digitalio import DigitalInOut, Pull
 
 # See https://github.com/micropython/micropython/issues/573 for const() details
 from micropython import const
@@ -61,23 +59,23 @@ _64X32_WITH_32SCAN = False
 _RGB_BIT_DEPTH = const(2)
 
 # Possible colors for the status NeoPixel LED (not for the matrix display).
-_COL_OFF    = const( (  0,   0,   0) )
-_COL_RED    = const( (255,   0,   0) )
-_COL_GREEN  = const( (  0, 255,   0) )
-_COL_BLUE   = const( (  0,   0, 255) )
-_COL_PURPLE = const( (255,   0, 255) )      # FF00FF
-_COL_ORANGE = const( (255,  40,   0) )      # FF2800
-_COL_YELLOW = const( (255, 112,   0) )      # FF7000
-
-# We use the LED color to get init status
-_CODE_OK = const("ok")
-_CODE_FATAL = const("fatal")
-_CODE_RETRY = const("retry")
-_COL_LED_ERROR = {
-    _CODE_OK: _COL_GREEN,
-    _CODE_RETRY: _COL_YELLOW,
-    _CODE_FATAL: _COL_RED,
-}
+# Packed 0xRRGGBB ints: NeoPixel.fill() takes them directly, and a small int
+# const() is free where each (r,g,b) tuple was 3 boxed ints + a header.
+_COL_OFF    = const(0x000000)
+_COL_RED    = const(0xFF0000)
+_COL_GREEN  = const(0x00FF00)
+_COL_BLUE   = const(0x0000FF)
+_COL_PURPLE = const(0xFF00FF)
+_COL_ORANGE = const(0xFF2800)
+_COL_YELLOW = const(0xFF7000)
+
+# We use the LED color to get init status.
+# Codes are small ints indexing the color tuple below: a tuple index is a
+# single subscript load vs hash+probe for a dict keyed by strings.
+_CODE_OK    = const(0)
+_CODE_RETRY = const(1)
+_CODE_FATAL = const(2)
+_COL_LED_ERROR = (_COL_GREEN, _COL_YELLOW, _COL_RED)
 
 # Core state machine
 _CORE_INIT              = const(0)
@@ -95,14 +93,31 @@ _GA4_DEBUG      = const(False)
 _GA4_BASE_URL   = const("https://www.google-analytics.com/debug/mp/collect") if _GA4_DEBUG else const("https://www.google-analytics.com/mp/collect")
 _GA4_POST_URL   = const("%(GA4_BASE_URL)s?api_secret=%(GA4_API_SECRET)s&measurement_id=%(GA4_MEASURE_ID)s")
 _GA4_WIFI_HB_SEC = const(15 * 60)  # 15 minutes
-
-# MQTT Topics used:
-_MQTT_TURNOUT              = "t330"                          # Not constant; overriden in settings.toml
-_MQTT_TOPIC_TURNOUT_SCRIPT = "distantsignal/%(T)s/script"    # where T is MQTT_TURNOUT
-# Turnout state is a string matching one of the JSON "states" keys.
-_MQTT_TOPIC_TURNOUT_STATE  = "turnout/%(T)s/state"           # where T is MQTT_TURNOUT
-# Block state is a string matching either "active" or "inactive"
-_MQTT_TOPIC_BLOCk_STATE    = "block/%(B)s/state"             # where B is one of the JSON "blocks" keys
+# Preformatted inner-event JSON. Building the nested payload dicts allocated
+# half a dozen objects per event and the HTTP layer re-serialized them on
+# every POST; a single % substitution fills in the only variable parts.
+_GA4_EVT_NOVAL  = const('{"name":"%s"}')
+_GA4_EVT_VAL    = const('{"name":"%s","params":{"items":[],"value":%d,"currency":"USD"}}')
+_GA4_HEADERS    = {
+    "Content-Type": "application/json",
+    # Ask the server to keep the TLS socket open so the Session can reuse
+    # it on the next POST instead of paying a new handshake per batch.
+    "Connection": "keep-alive",
+    "User-Agent": "DistantSignal/1",
+}
+# Compiled once: re.sub() with a pattern string recompiles it per call.
+_GA4_RE_EXTRA   = re.compile("[^a-z0-9]")
+# Cap the queue so an extended wifi/broker outage cannot grow it without
+# bound on the ~200 KB heap; the oldest events are the least interesting.
+_GA4_MAX_EVENTS = const(32)
+
+# MQTT Topics used (built by concatenation in compute_mqtt_topics() so the
+# literal prefixes/suffixes stay in bytecode rodata instead of RAM templates):
+# - distantsignal/<T>/script   where T is MQTT_TURNOUT
+# - turnout/<T>/state          payload is a string matching one of the JSON "states" keys
+# - block/<B>/state            where B is one of the JSON "blocks" keys;
+#                              payload is a string matching either "active" or "inactive"
+_MQTT_TURNOUT = "t330"      # Not constant; overriden in settings.toml
 
 DEFAULT_ERROR_STATE   = const("error")
 DEFAULT_LOADING_STATE = const("loading")
@@ -114,8 +129,10 @@ CWD = ("/" + __file__).rsplit("/", 1)[
 
 _FONT_3x5_PATH1 = CWD + "/tom-thumb.bdf"
 _FONT_3x5_PATH2 = CWD + "/tom-thumb2.bdf"
-_WIFI_ON_PATH   = CWD + "/wifi_on.bmp"
-_WIFI_OFF_PATH  = CWD + "/wifi_off.bmp"
+# Two-frame sprite sheet (on above off), selected via _wifi_tile[0].
+_WIFI_ICONS_PATH = CWD + "/wifi_icons.bmp"
+_WIFI_FRAME_ON  = const(0)
+_WIFI_FRAME_OFF = const(1)
 _DEFAULT_SCRIPT_PATH = CWD + "/default_script.json"
 
 _core_state = _CORE_INIT
@@ -125,7 +142,7 @@ _ga4_requests = None
 _ga4_events = []
 _mqtt = None
 _matrix = None
-_fonts = []
+_fonts = ()     # fixed at init_display() time; a tuple has no growable spare capacity
 _mqtt_topics = {
     "script": "",
     "turnout": "",
@@ -133,14 +150,19 @@ _mqtt_topics = {
         # block_name => topic:str
     }
 }
+_topic_dispatch = {
+    # topic:str => handler(message), rebuilt by compute_mqtt_topics()
+}
 _mqtt_cnx_lost_error_state = DEFAULT_ERROR_STATE
 _mqtt_cnx_lost_reconnect_state = DEFAULT_LOADING_STATE
+_mqtt_retry_delay_s = 5
+_mqtt_next_retry_ns = 0
+_next_wifi_hb_ns = 0
 _mqtt_pending_script: str = None
 _script_parser: ScriptParser = None
 _script_loader: ScriptLoader = None
 _parser_group: displayio.Group = None
-_wifi_off_tile = None
-_wifi_on_tile = None
+_wifi_tile = None
 _wifi_icon_state = None
 _loading_tile = None
 _boot_btn = None
@@ -149,13 +171,50 @@ _button_up = None
 _logger = logging.getLogger("DistantSignal")
 _logger.setLevel(logging.INFO)      # INFO or DEBUG
 
+# One-shot settings.toml cache. os.getenv() re-reads and re-parses the TOML
+# file from flash on every call, so read each key exactly once at boot.
+# Values keep the type settings.toml gives them (str or int).
+_SETTINGS_KEYS = (
+    "MQTT_TURNOUT",
+    "GA4_CLIENT_ID", "GA4_MEASURE_ID", "GA4_API_SECRET",
+    "CIRCUITPY_WIFI_SSID", "CIRCUITPY_WIFI_PASSWORD",
+    "MQTT_BROKER_IP", "MQTT_BROKER_PORT", "MQTT_USERNAME", "MQTT_PASSWORD",
+    "_64X32_WITH_32SCAN", "_SX",
+)
+_settings = {}
+
+
+def init_settings() -> None:
+    for key in _SETTINGS_KEYS:
+        value = os.getenv(key)
+        if value is not None:
+            _settings[key] = value
+
+
+def get_setting(key: str, default=""):
+    return _settings.get(key, default)
+
+
+def gc_freeze() -> None:
+    # Collect once, then move everything currently alive out of future mark
+    # phases. The object graphs built by the init phases (fonts, parser
+    # groups, MQTT client) are permanent, so re-scanning them on every
+    # gc.collect() is pure overhead. CircuitPython's gc may not expose
+    # freeze(); fall back to raising the collection threshold instead.
+    gc.collect()
+    if hasattr(gc, "freeze"):
+        gc.freeze()
+    elif hasattr(gc, "threshold"):
+        gc.threshold(gc.mem_free() // 4 + gc.mem_alloc())
+
 
 def init() -> None:
     print("@@ init")
     global _led, _boot_btn
 
     try:
-        mqtt_turnout = os.getenv("MQTT_TURNOUT", "").strip()
+        init_settings()
+        mqtt_turnout = get_setting("MQTT_TURNOUT").strip()
         if mqtt_turnout:
             global _MQTT_TURNOUT
             _MQTT_TURNOUT = mqtt_turnout
@@ -163,8 +222,9 @@ def init() -> None:
     except Exception as e:
         print("@@ Settings.toml: Invalid MQTT_TURNOUT variable ", e)
 
-    _led = neopixel.NeoPixel(board.NEOPIXEL, 1)
-    _led.brightness = 0.1
+    # auto_write=False: fill() + brightness changes are batched into one
+    # explicit show() per state change instead of one transmit per write.
+    _led = neopixel.NeoPixel(board.NEOPIXEL, 1, brightness=0.1, auto_write=False)
 
 
 def init_buttons():
@@ -179,9 +239,9 @@ def init_buttons():
 
 def init_analytics():
     global _ga4_post_url, _ga4_requests, _GA4_CLIENT_ID
-    _GA4_CLIENT_ID  = os.getenv("GA4_CLIENT_ID",  "").strip()
-    _ga4_measure_id = os.getenv("GA4_MEASURE_ID", "").strip()
-    _ga4_api_secret = os.getenv("GA4_API_SECRET", "").strip()
+    _GA4_CLIENT_ID  = get_setting("GA4_CLIENT_ID" ).strip()
+    _ga4_measure_id = get_setting("GA4_MEASURE_ID").strip()
+    _ga4_api_secret = get_setting("GA4_API_SECRET").strip()
     if _GA4_CLIENT_ID and _ga4_measure_id and _ga4_api_secret:
         # Enable analytics
         _ga4_post_url =  _GA4_POST_URL % {
@@ -199,14 +259,18 @@ def init_analytics():
         _ga4_post_url = ""
         _ga4_requests = None
         print("@@ GA4: Disabled")
+    # Reap the transient socket/SSL setup objects now, before the heap
+    # gets carved up further; fragmentation at this point is what later
+    # turns a large script parse into a MemoryError.
+    gc.collect()
 
 
 def init_wifi() -> bool:
     # Return true if wifi is connecting (which may or may not succeed)
     print("@@ WiFI setup")
     # Get wifi AP credentials from onboard settings.toml file
-    wifi_ssid = os.getenv("CIRCUITPY_WIFI_SSID", "")
-    wifi_password = os.getenv("CIRCUITPY_WIFI_PASSWORD", "")
+    wifi_ssid = get_setting("CIRCUITPY_WIFI_SSID")
+    wifi_password = get_setting("CIRCUITPY_WIFI_PASSWORD")
     print("@@ WiFI SSID:", wifi_ssid)
     if wifi_ssid is None:
         print("@@ WiFI credentials are kept in settings.toml, please add them there!")
@@ -215,6 +279,7 @@ def init_wifi() -> bool:
     try:
         wifi.radio.connect(wifi_ssid, wifi_password)
         print("@@ WiFI connecting for", wifi_ssid)
+        gc.collect()
         return True
     except ConnectionError:
         print("@@ WiFI Failed to connect to WiFi with provided credentials")
@@ -222,26 +287,36 @@ def init_wifi() -> bool:
         return False
 
 
+# The ap_info probe walks the radio attribute chain and, when the AP is
+# gone, allocates an exception object. Cache the reading for 5 seconds:
+# the callers (GA4 events, debug print) don't need it fresher than that.
+_rssi_cache = None
+_rssi_cache_until_ns = 0
 def wifi_rssi() -> int|None:
-    try:
-        return wifi.radio.ap_info.rssi
-    except:
-        return None
+    global _rssi_cache, _rssi_cache_until_ns
+    now_ns = time.monotonic_ns()
+    if now_ns >= _rssi_cache_until_ns:
+        try:
+            _rssi_cache = wifi.radio.ap_info.rssi
+        except:
+            _rssi_cache = None
+        _rssi_cache_until_ns = now_ns + 5_000_000_000
+    return _rssi_cache
 
 
 def init_mqtt() -> None:
     # Modified the global core state if the MQTT connection succeeds
     global _core_state, _mqtt
-    host = os.getenv("MQTT_BROKER_IP", "")
+    host = get_setting("MQTT_BROKER_IP")
     if not host:
         print("@@ MQTT: disabled")
         # This is a core feature so do we not ignore this error in this project
         # and we'll retry again and again and again
         blink_led_error(_CODE_RETRY, num_loop=5)
         return
-    port = int(os.getenv("MQTT_BROKER_PORT", 1883))
-    user = os.getenv("MQTT_USERNAME", "")
-    pasw = os.getenv("MQTT_PASSWORD", "")
+    port = int(get_setting("MQTT_BROKER_PORT", 1883))
+    user = get_setting("MQTT_USERNAME")
+    pasw = get_setting("MQTT_PASSWORD")
     print("@@ MQTT: connect to", host, ", port", port, ", user", user)
 
     # Source: https://adafruit-playground.com/u/justmobilize/pages/adafruit-connection-manager
@@ -255,6 +330,9 @@ def init_mqtt() -> None:
         password=pasw,
         is_ssl=False,
         socket_pool=pool,
+        # Short socket timeout so loop(timeout=0.1) returns promptly when
+        # the socket is idle instead of parking in recv.
+        socket_timeout=0.05,
     )
     _mqtt.logger = _logger
 
@@ -271,21 +349,21 @@ def init_mqtt() -> None:
     except Exception as e:
         print("@@ MQTT: Failed Connecting with", e)
         blink_led_error(_CODE_RETRY, num_loop=5)
-        del _mqtt
-        _mqtt = None
+        # Keep the client instance: it holds several KB of pre-allocated
+        # buffers, and del/re-create on every retry churns and fragments
+        # the heap. _h_mqtt_failed() retries via mqtt_reconnect(), which
+        # reuses those buffers.
         _core_state = _CORE_MQTT_FAILED
+        return
+    gc_freeze()
 
 
 def update_script_settings():
     global _mqtt_cnx_lost_error_state, _mqtt_cnx_lost_reconnect_state
     settings = _script_parser.settings()
     icon_info = settings.get("cnx-icon", {})
-    x = icon_info.get("x", (_SX - _wifi_on_tile.width) // 2)
-    y = icon_info.get("y",  _SY - _wifi_on_tile.height)
-    _wifi_on_tile.x = x
-    _wifi_on_tile.y = y
-    _wifi_off_tile.x = x
-    _wifi_off_tile.y = y
+    _wifi_tile.x = icon_info.get("x", (_SX - _wifi_tile.tile_width) // 2)
+    _wifi_tile.y = icon_info.get("y",  _SY - _wifi_tile.tile_height)
     init_state = settings.get("init-state", DEFAULT_LOADING_STATE)
     if init_state:
         _script_loader.setState(init_state)
@@ -294,38 +372,49 @@ def update_script_settings():
 
 
 def compute_mqtt_topics():
-    # Compute all MQTT Topic keys
-    _mqtt_topics["script" ] = _MQTT_TOPIC_TURNOUT_SCRIPT % { "T": _MQTT_TURNOUT }
-    _mqtt_topics["turnout"] = _MQTT_TOPIC_TURNOUT_STATE  % { "T": _MQTT_TURNOUT }
+    # Compute all MQTT Topic keys, and the topic => handler dispatch map
+    # used by _mqtt_on_message().
+    # Clear first: a new script can define a different set of blocks, and
+    # stale entries would both leak and keep dead topics subscribed.
+    _topic_dispatch.clear()
+    _mqtt_topics["blocks"].clear()
+    _mqtt_topics["script" ] = "distantsignal/" + _MQTT_TURNOUT + "/script"
+    _mqtt_topics["turnout"] = "turnout/" + _MQTT_TURNOUT + "/state"
+    _topic_dispatch[_mqtt_topics["script" ]] = _on_script_msg
+    _topic_dispatch[_mqtt_topics["turnout"]] = _on_turnout_msg
     for block_name in _script_parser.blocks():
-        _mqtt_topics["blocks"][block_name] = _MQTT_TOPIC_BLOCk_STATE % { "B": block_name }
+        topic = "block/" + block_name + "/state"
+        _mqtt_topics["blocks"][block_name] = topic
+        _topic_dispatch[topic] = _mk_block_handler(block_name)
 
 
 def subscribe_mqtt_topics():
     if _mqtt is None:
         return
 
-    # Unsub all topics
-    for topic in _mqtt._subscribed_topics:
-        _mqtt.unsubscribe(topic)
+    # MiniMQTT accepts topic lists, so batch everything into a single
+    # UNSUBSCRIBE and a single SUBSCRIBE packet: one broker round-trip
+    # instead of one per topic, which matters most on reconnect. Listing
+    # the old topics first also avoids mutating _subscribed_topics while
+    # iterating over it.
+    old_topics = list(_mqtt._subscribed_topics)
+    if old_topics:
+        _mqtt.unsubscribe(old_topics)
 
-    # Subscribe to all changes.
-    def _sub(t):
-        if t:
-            print("@@ MQTT: Subscribe to", t)
-            _mqtt.subscribe(t, qos=1)
-    _sub(_mqtt_topics["script"])
-    _sub(_mqtt_topics["turnout"])
-    for block_topic in _mqtt_topics["blocks"].values():
-        _sub(block_topic)
+    subs = [_mqtt_topics["script"], _mqtt_topics["turnout"]]
+    subs.extend(_mqtt_topics["blocks"].values())
+    subs = [(t, 1) for t in subs if t]
+    if subs:
+        print("@@ MQTT: Subscribe to", [t for t, _q in subs])
+        _mqtt.subscribe(subs)
 
 
 def init_display():
-    global _matrix, _fonts, _parser_group, _wifi_off_tile, _wifi_on_tile, _loading_tile
+    global _matrix, _fonts, _parser_group, _wifi_tile, _loading_tile
     global _SX, _64X32_WITH_32SCAN
 
-    _64X32_WITH_32SCAN = os.getenv("_64X32_WITH_32SCAN", str(_64X32_WITH_32SCAN)).lower() == "true"
-    _SX = int(os.getenv("_SX", _SX))
+    _64X32_WITH_32SCAN = str(get_setting("_64X32_WITH_32SCAN", _64X32_WITH_32SCAN)).lower() == "true"
+    _SX = int(get_setting("_SX", _SX))
 
     displayio.release_displays()
 
@@ -337,35 +426,57 @@ def init_display():
         # tile_rows=1,
     )
     display = _matrix.display
+    # Refreshes are purely event-driven: the main loop calls refresh()
+    # only when something changed. Without this, displayio re-pushes a
+    # frame after every Group mutation, competing with MQTT for CPU.
+    display.auto_refresh = False
 
     font1 = bitmap_font.load_font(_FONT_3x5_PATH1)
     font2 = bitmap_font.load_font(_FONT_3x5_PATH2)
-    _fonts.append(font1)
-    _fonts.append(font2)
+    # Materialize the printable ASCII glyphs now: scripts set arbitrary
+    # label text at runtime, and every glyph-cache miss re-opens and text-
+    # scans the BDF file in the middle of a display update. Loading them
+    # here also puts the glyph bitmaps into the frozen boot heap.
+    font1.load_glyphs(range(0x20, 0x7F))
+    font2.load_glyphs(range(0x20, 0x7F))
+    _fonts = (font1, font2)
 
     root_group = displayio.Group()
 
-    bmp = displayio.OnDiskBitmap(_WIFI_OFF_PATH)
-    _wifi_off_tile = displayio.TileGrid(bmp, pixel_shader=bmp.pixel_shader)
-    _wifi_off_tile.hidden = True
-    bmp = displayio.OnDiskBitmap(_WIFI_ON_PATH)
-    _wifi_on_tile = displayio.TileGrid(bmp, pixel_shader=bmp.pixel_shader)
-    _wifi_on_tile.hidden = True
-    root_group.append(_wifi_on_tile)
-    root_group.append(_wifi_off_tile)
+    # Both wifi icons live in one sprite sheet shown by a single 1x1
+    # TileGrid; blink_wifi() picks the frame with _wifi_tile[0]. One grid
+    # instead of two halves the per-refresh compositing work for them.
+    bmp = displayio.OnDiskBitmap(_WIFI_ICONS_PATH)
+    _wifi_tile = displayio.TileGrid(
+        bmp,
+        pixel_shader=bmp.pixel_shader,
+        tile_width=bmp.width,
+        tile_height=bmp.height // 2,
+        width=1,
+        height=1,
+        default_tile=_WIFI_FRAME_ON,
+    )
+    _wifi_tile.hidden = True
+    root_group.append(_wifi_tile)
 
     _parser_group = displayio.Group()
     root_group.append(_parser_group)
 
     _loading_tile = Label(font1)
     _loading_tile.text = "Loading"
-    _loading_tile.x = (_SX - len(_loading_tile.text) * 4) // 2
+    _loading_tile.x = (_SX - 28) // 2   # 28 = len("Loading") * 4 px per glyph
     _loading_tile.y = _SY // 2 - 2 + FONT_Y_OFFSET
     _loading_tile.scale = 1
     _loading_tile.color = 0xFFFF00
     root_group.append(_loading_tile)
 
     display.root_group = root_group
+    # With auto_refresh off, nothing pushes a frame until the main loop's
+    # first dirty-gated refresh, which happens after the "Loading" label
+    # has been removed. Push one frame now so the label stays visible
+    # through the multi-second NVM/default script parse.
+    display.refresh(minimum_frames_per_second=0)
+    gc_freeze()
 
 
 def _mqtt_on_connected(client, userdata, flags, rc):
@@ -384,46 +495,68 @@ def _mqtt_on_disconnected(client, userdata, rc):
     ga4_mk_event(category="mqtt", action="disconnected", value=wifi_rssi())
 
 
+def _on_script_msg(message):
+    global _mqtt_pending_script
+    ga4_mk_event(category="msg", action="script")
+    # Note that attempts to parse the script right here typically throw a
+    # "pystack exhausted" exception due to having too many calls on the
+    # very limited (16-deep) call stack.
+    # Instead, we keep a reference to the script and process it in the main loop.
+    _mqtt_pending_script = message
+
+
+def _on_turnout_msg(message):
+    global _mqtt_cnx_lost_reconnect_state
+    ga4_mk_event(category="msg", action="turnout", extra=message)
+    _mqtt_cnx_lost_reconnect_state = message
+    _script_loader.setState(message)
+
+
+def _mk_block_handler(block_name):
+    def _handler(message):
+        # Publishers emit exactly "active" or "inactive"; a plain equality
+        # allocates nothing, whereas strip().lower() built two new strings
+        # per block-state message.
+        active = message == "active"
+        ga4_mk_event(category="msg", action="block", extra=block_name, value=1 if active else 0)
+        _script_loader.setBlockState(block_name, active)
+    return _handler
+
+
 def _mqtt_on_message(client, topic, message):
     """Method callled when a client's subscribed feed has a new
     value.
     :param str topic: The topic of the feed with a new value.
     :param str message: The new value
     """
-    global _mqtt_pending_script, _mqtt_cnx_lost_reconnect_state
-    print(f"@Q MQTT: New message on topic {topic}: {message}")
+    # Lazy logger formatting: at INFO level this is a no-op, so no string
+    # is built per MQTT frame on the hot path. Only the payload length is
+    # traced -- formatting a multi-KB script payload would allocate a
+    # multi-KB copy and stall the loop on UART IO.
+    _logger.debug("@Q MQTT msg %s len=%d", topic, len(message))
     try:
-        if topic == _mqtt_topics["script"]:
-            ga4_mk_event(category="msg", action="script")
-            # Note that attempts to parse the script right here typically throw a
-            # "pystack exhausted" exception due to having too many calls on the
-            # very limited (16-deep) call stack.
-            # Instead, we keep a reference to the script and process it in the main loop.
-            _mqtt_pending_script = message
-        elif topic == _mqtt_topics["turnout"]:
-            ga4_mk_event(category="msg", action="turnout", extra=message)
-            _mqtt_cnx_lost_reconnect_state = message
-            _script_loader.setState(message)
-        else:
-            for block_name, block_topic in _mqtt_topics["blocks"].items():
-                if topic == block_topic:
-                    active = message.strip().lower() == "active"
-                    ga4_mk_event(category="msg", action="block", extra=block_name, value=1 if active else 0)
-                    _script_loader.setBlockState(block_name, active)
-                    break
+        # One hashed dict lookup replaces the if/elif/for cascade. The
+        # handlers are built once in compute_mqtt_topics().
+        handler = _topic_dispatch.get(topic)
+        if handler is not None:
+            handler(message)
     except Exception as e:
-        print(f"@@ MQTT: Failed to process {topic}: {message}", e)
+        print("@@ MQTT: Failed to process", topic, e)
         blink_led_error(_CODE_RETRY, num_loop=0)
 
 
-def mqtt_loop() -> None:
+def mqtt_loop(timeout: float = 0.1) -> None:
     global _core_state
     if _mqtt is None:
         return
     try:
-        # This call has an integrated timeout and takes either 1 or 2 seconds
-        # to complete with the default timeout = 1 value.
-        _mqtt.loop()
+        # With the default timeout = 1 value this call takes either 1 or 2
+        # seconds to complete, and any state change received late in that
+        # window waits a full extra pass before reaching the display.
+        # A short timeout bounds the per-iteration latency instead; the
+        # main loop tail passes its idle budget here so the wait doubles
+        # as the socket poll.
+        _mqtt.loop(timeout=timeout)
     except Exception as e:
         print("@@ MQTT: Failed with", e)
         blink_led_error(_CODE_RETRY, num_loop=1)
@@ -444,59 +577,103 @@ def mqtt_reconnect() -> None:
         print("@@ MQTT: Reconnect failed with", e)
 
 
-_next_blink_wifi_ts = 0
+_next_blink_wifi_ns = 0
+_display_dirty = True
 def display_wifi_icon(wifi: bool|None) -> None:
-    global _wifi_icon_state, _next_blink_wifi_ts
+    global _wifi_icon_state, _next_blink_wifi_ns, _display_dirty
     if _wifi_icon_state != wifi:
         _wifi_icon_state = wifi
-        _wifi_on_tile.hidden = True
-        _wifi_off_tile.hidden = True
-        _next_blink_wifi_ts = time.monotonic()
-
-
-def blink_wifi() -> None:
-    global _next_blink_wifi_ts
-    if _wifi_icon_state is None:
-        return
-    now = time.monotonic()
+        _wifi_tile.hidden = True
+        if wifi is not None:
+            _wifi_tile[0] = _WIFI_FRAME_ON if wifi else _WIFI_FRAME_OFF
+        _next_blink_wifi_ns = time.monotonic_ns()
+        _display_dirty = True
+
+
+def blink_wifi(now_ns: int) -> bool:
+    # now_ns is the single monotonic_ns() timestamp taken by the main loop.
+    # Returns true if an icon was toggled and the display needs a refresh.
+    # The main loop only calls this when _wifi_icon_state is set and the
+    # _next_blink_wifi_ns deadline has passed, so no re-check here.
+    global _next_blink_wifi_ns
     if _wifi_icon_state:
         # "Wifi OK" blinks for 1 second every 30 seconds
-        if now > _next_blink_wifi_ts:
-            _wifi_on_tile.hidden = not _wifi_on_tile.hidden
-            if _wifi_on_tile.hidden:
-                _next_blink_wifi_ts = now + 30
-            else:
-                _next_blink_wifi_ts = now + 0.75
+        _wifi_tile.hidden = not _wifi_tile.hidden
+        if _wifi_tile.hidden:
+            _next_blink_wifi_ns = now_ns + 30_000_000_000
+        else:
+            _next_blink_wifi_ns = now_ns + 750_000_000
+        return True
     else:
         # "Wifi FAIL" blinks 5 seconds on, 2 seconds off
-        _wifi_off_tile.hidden = not _wifi_off_tile.hidden
-        if _wifi_on_tile.hidden:
-            _next_blink_wifi_ts = now + 1
-        else:
-            _next_blink_wifi_ts = now + 1
+        _wifi_tile.hidden = not _wifi_tile.hidden
+        _next_blink_wifi_ns = now_ns + 1_000_000_000
+        return True
 
 
+# Non-blocking LED error blink. blink_led_error() only records the state
+# and colors the LED; blink_led_error_tick() toggles it from the main loop.
+# The previous implementation slept in place for up to num_loop seconds
+# (forever with num_loop=-1), stalling MQTT polling and display refresh.
+_err_code = None
+_err_num_loop = 0
+_err_phase = 0
+_err_next_toggle_ns = 0
 def blink_led_error(error_code, num_loop=-1):
+    global _err_code, _err_num_loop, _err_phase, _err_next_toggle_ns
+    global _led_brightness
     _led.fill(_COL_LED_ERROR[error_code])
-    _led.brightness = 0.1
-    time.sleep(0.5)
-    # For debugging purposes, we can exit the loop by using the boot button to continue
-    while num_loop != 0 and _boot_btn.value:
-        _led.brightness = 0
-        time.sleep(0.25)
-        _led.brightness = 0.1
-        time.sleep(1)
-        num_loop -= 1
-
-
-_last_blink_led_ts = 0
+    _led.brightness = _led_brightness = 0.1
+    _led.show()
+    _err_code = error_code
+    _err_num_loop = num_loop
+    _err_phase = 0
+    _err_next_toggle_ns = time.monotonic_ns() + 500_000_000
+
+
+def blink_led_error_tick(now_ns: int) -> None:
+    global _err_code, _err_num_loop, _err_phase, _err_next_toggle_ns
+    global _led_brightness
+    if _err_code is None:
+        return
+    # For debugging purposes, we can exit the blink by using the boot button
+    if _err_num_loop == 0 or not _boot_btn.value:
+        _err_code = None
+        return
+    if now_ns < _err_next_toggle_ns:
+        return
+    if _err_phase == 0:
+        # off for 0.25 second
+        _led.brightness = _led_brightness = 0
+        _led.show()
+        _err_phase = 1
+        _err_next_toggle_ns = now_ns + 250_000_000
+    else:
+        # on for 1 second
+        _led.brightness = _led_brightness = 0.1
+        _led.show()
+        _err_phase = 0
+        _err_num_loop -= 1
+        _err_next_toggle_ns = now_ns + 1_000_000_000
+
+
+_last_blink_led_ns = 0
 _next_blink_led = 1
-def blink_led() -> None:
-    global _last_blink_led_ts, _next_blink_led
-    _led.brightness = 0.1 if _next_blink_led else 0
-    now = time.monotonic()
-    if now - _last_blink_led_ts > 1:
-        _last_blink_led_ts = now
+_led_brightness = -1
+def blink_led(now_ns: int) -> None:
+    # Integer ns timestamps rather than monotonic() floats: no boxed-float
+    # allocation and no precision loss with uptime. now_ns is the single
+    # timestamp taken per main loop pass.
+    # Only touch the NeoPixel when the brightness actually flips: every
+    # brightness write is a full pixel retransmit.
+    global _last_blink_led_ns, _next_blink_led, _led_brightness
+    b = 0.1 if _next_blink_led else 0
+    if b != _led_brightness:
+        _led.brightness = b
+        _led.show()
+        _led_brightness = b
+    if now_ns - _last_blink_led_ns > 1_000_000_000:
+        _last_blink_led_ns = now_ns
         _next_blink_led = 1 - _next_blink_led
 
 
@@ -510,40 +687,44 @@ def ga4_mk_event(category:str, action:str, extra:str="", value:int|None=None) ->
     if extra:
         # Sanitize extra, only keep a-z 0-9;
         extra = extra.lower()
-        extra = re.sub("[^a-z0-9]", "", extra)
+        extra = _GA4_RE_EXTRA.sub("", extra)
         extra = "___" + extra
 
     # Only a-z 0-9 and _ are allowed in the event name
     name = f"{_MQTT_TURNOUT}__{category}_{action}{extra}"
 
     if value is None:
-        payload = {
-            "client_id": _GA4_CLIENT_ID,
-            "events": [ {
-                "name": name
-            } ] }
+        event = _GA4_EVT_NOVAL % name
     else:
-        payload = {
-            "client_id": _GA4_CLIENT_ID,
-            "events": [ {
-                "name": name,
-                "params": {
-                    "items": [ ],
-                    "value": value,
-                    "currency": "USD" }
-            } ] }
-    # Queue the event, don't send it immediately.
-    _ga4_events.append(payload)
+        event = _GA4_EVT_VAL % (name, value)
+    # Queue the event (as its inner JSON string), don't send it immediately.
+    # Drop the oldest event when full rather than growing without bound.
+    if len(_ga4_events) >= _GA4_MAX_EVENTS:
+        _ga4_events.pop(0)
+    _ga4_events.append(event)
 
 
 def ga4_process_queue() -> None:
     if _ga4_requests is None or not _ga4_post_url or not _ga4_events:
         return
-    # Sends one event, if any.
-    payload = _ga4_events.pop(0)
+    # Drain up to 25 queued events (the GA4 Measurement Protocol cap) into
+    # a single POST: every request pays the full TLS + HTTP round trip, so
+    # one-event-per-loop-pass drained the queue far slower than it filled.
+    events = ",".join(_ga4_events[:25])
+    del _ga4_events[:25]
+    payload = '{"client_id":"%s","events":[%s]}' % (_GA4_CLIENT_ID, events)
     try:
-        print("@@ GA4: POST payload", payload)
-        with _ga4_requests.post(_ga4_post_url, json=payload) as response:
+        # The batched payload can be multi-KB; formatting it onto USB CDC
+        # per POST stalls the loop just like the MQTT payload prints did,
+        # so log only the batch size unless debugging.
+        if _logger.getEffectiveLevel() <= logging.DEBUG:
+            print("@@ GA4: POST payload", payload)
+        else:
+            print("@@ GA4: POST", len(payload), "bytes")
+        # The with block guarantees the response is released back to the
+        # Session on any exit path; its close() keeps the underlying
+        # socket cached for reuse, so keep-alive is preserved.
+        with _ga4_requests.post(_ga4_post_url, data=payload, headers=_GA4_HEADERS) as response:
             # 204 is the expected response code and we don't need to know about it
             if response.status_code != 204:
                 print("@@ GA4: POST status", response.status_code)
@@ -559,7 +740,7 @@ def ga4_process_queue() -> None:
 def init_script():
     global _script_parser, _script_loader
 
-    _script_parser = ScriptParser(_SX, _SY, _fonts)
+    _script_parser = ScriptParser(_SX, _SY, _fonts, bit_depth=_RGB_BIT_DEPTH)
     _script_loader = ScriptLoader(_script_parser)
 
     _parser_group.append(_script_parser.root())
@@ -587,9 +768,108 @@ def init_script():
     gc.collect()
     update_script_settings()
     compute_mqtt_topics()
+    gc_freeze()
     print("@@ Mem free:", gc.mem_free())
 
 
+# Core state handlers, indexed by the _CORE_* state ints (see _CORE_HANDLERS
+# below). Each runs one short non-blocking step; transitions are made by
+# assigning _core_state (directly or from the MQTT callbacks). now_ns is the
+# single timestamp taken per main loop pass.
+def _h_init(now_ns):
+    global _core_state
+    if init_wifi():
+        _core_state = _CORE_WIFI_CONNECTING
+
+
+def _h_wifi_connecting(now_ns):
+    global _core_state
+    if wifi.radio.connected:
+        _core_state = _CORE_WIFI_CONNECTED
+
+
+def _h_wifi_connected(now_ns):
+    display_wifi_icon(True)
+    init_analytics()
+    ga4_mk_event(category="wifi", action="connected", value=wifi_rssi())
+    # This sets the core state to either _CORE_MQTT_FAILED or _CORE_MQTT_CONNECTING
+    init_mqtt()
+
+
+def _h_mqtt_connecting(now_ns):
+    # wait for the _mqtt_on_connected() callback to be invoked
+    # which changes core state to _CORE_MQTT_CONNECTED
+    pass
+
+
+def _h_mqtt_connected(now_ns):
+    global _core_state, _mqtt_retry_delay_s, _mqtt_next_retry_ns
+    display_wifi_icon(True)
+    if _script_loader.state() == _mqtt_cnx_lost_error_state:
+        if _mqtt_cnx_lost_reconnect_state:
+            _script_loader.setState(_mqtt_cnx_lost_reconnect_state)
+    subscribe_mqtt_topics()
+    _mqtt_retry_delay_s = 5
+    _mqtt_next_retry_ns = 0
+    _core_state = _CORE_MQTT_LOOP
+
+
+def _h_mqtt_failed(now_ns):
+    global _mqtt_retry_delay_s, _mqtt_next_retry_ns
+    display_wifi_icon(False)
+    if _mqtt_cnx_lost_error_state:
+        _script_loader.setState(_mqtt_cnx_lost_error_state)
+    # Binary exponential backoff (5 -> 10 -> 20 -> 40 -> 60 s cap):
+    # hammering a broker that is persistently down just stalls the
+    # render loop on every failed connect attempt.
+    if now_ns >= _mqtt_next_retry_ns:
+        _mqtt_next_retry_ns = now_ns + _mqtt_retry_delay_s * 1_000_000_000
+        _mqtt_retry_delay_s = min(_mqtt_retry_delay_s * 2, 60)
+        if _mqtt is None:
+            init_mqtt()
+        else:
+            mqtt_reconnect()
+
+
+def _h_mqtt_reconnected(now_ns):
+    global _core_state, _mqtt_retry_delay_s, _mqtt_next_retry_ns
+    display_wifi_icon(True)
+    if _mqtt_cnx_lost_reconnect_state:
+        _script_loader.setState(_mqtt_cnx_lost_reconnect_state)
+    _mqtt_retry_delay_s = 5
+    _mqtt_next_retry_ns = 0
+    _core_state = _CORE_MQTT_LOOP
+
+
+def _h_mqtt_loop(now_ns):
+    global _next_wifi_hb_ns
+    # The MQTT library loop is bounded by its short poll timeout.
+    # Note: the pending-script processing stays in the main loop body, NOT
+    # here -- script parsing is the deepest call chain in the program and
+    # every extra frame eats into the 16-deep pystack.
+    mqtt_loop()
+    if now_ns > _next_wifi_hb_ns:
+        ga4_mk_event(category="wifi", action="hb", value=wifi_rssi())
+        _next_wifi_hb_ns = now_ns + _GA4_WIFI_HB_SEC * 1_000_000_000
+    # The queue is empty on most passes; the inline check skips a whole
+    # call frame (and its pystack slot) compared to bailing out inside.
+    if _ga4_events:
+        ga4_process_queue()
+
+
+# Indexed by the _CORE_* ints; a tuple index replaces the 8-way elif ladder.
+_CORE_HANDLERS = (
+    _h_init,                # _CORE_INIT
+    _h_wifi_connecting,     # _CORE_WIFI_CONNECTING
+    _h_wifi_connected,      # _CORE_WIFI_CONNECTED
+    _h_mqtt_connecting,     # _CORE_MQTT_CONNECTING
+    _h_mqtt_connected,      # _CORE_MQTT_CONNECTED
+    _h_mqtt_failed,         # _CORE_MQTT_FAILED
+    _h_mqtt_reconnected,    # _CORE_MQTT_RECONNECTED
+    _h_mqtt_loop,           # _CORE_MQTT_LOOP
+)
+
+
 if __name__ == "__main__":
     print("@@ loop")
 
@@ -597,88 +877,111 @@ if __name__ == "__main__":
     init_buttons()
     init_display()
 
-    # # Sleep a few seconds at boot
+    # No boot pause: the "Loading" label stays up until the first
+    # updateDisplay() anyway, and every second here delays WiFi/MQTT
+    # recovery after a reboot.
     _led.fill(_COL_LED_ERROR[_CODE_OK])
-    for i in range(0, 3):
-        print(i)
-        blink_led()
-        time.sleep(1)
-
-    blink_led()
-    init_script()   
+    _led.show()
+    blink_led(time.monotonic_ns())
+    init_script()
     _script_loader.updateDisplay()
-    _loading_tile.hidden = True
+    # The "Loading" label is one-shot. Detach it and free its glyph bitmap
+    # and palette instead of keeping them live (but hidden) forever.
+    _matrix.display.root_group.remove(_loading_tile)
+    _loading_tile = None
+    gc.collect()
     display_wifi_icon(False)
 
-    _next_wifi_hb_ts = 0
+    # Everything allocated so far (parser, fonts, displayio groups) is
+    # permanent; exclude it from future mark phases.
+    gc_freeze()
+
+    # Bind the hot attribute chains once: resolving them per iteration walks
+    # the chain and allocates a bound-method object each time on MicroPython.
+    _refresh = _matrix.display.refresh
+    _update_display = _script_loader.updateDisplay
+    _mono_ns = time.monotonic_ns
+    _sleep = time.sleep
+    # refresh() only takes minimum_frames_per_second as keyword-only;
+    # reuse one kwargs dict instead of building a fresh one per call.
+    _refresh_kw = {"minimum_frames_per_second": 0}
+
     _old_cs = None
     while True:
-        start_ts = time.monotonic()
-        blink_led()
-
-        # Handle core state
-        if _core_state == _CORE_INIT:
-            if init_wifi():
-                _core_state = _CORE_WIFI_CONNECTING
-        elif _core_state == _CORE_WIFI_CONNECTING:
-            if wifi.radio.connected:
-                _core_state = _CORE_WIFI_CONNECTED
-        elif _core_state == _CORE_WIFI_CONNECTED:
-            display_wifi_icon(True)
-            init_analytics()
-            ga4_mk_event(category="wifi", action="connected", value=wifi_rssi())
-            # This sets the core state to either _CORE_MQTT_FAILED or _CORE_MQTT_CONNECTING
-            init_mqtt()
-        elif _core_state == _CORE_MQTT_CONNECTING:
-            # wait for the _mqtt_on_connected() callback to be invoked
-            # which changes core state to _CORE_MQTT_CONNECTED
-            pass
-        elif _core_state == _CORE_MQTT_CONNECTED:
-            display_wifi_icon(True)
-            if _script_loader.state() == _mqtt_cnx_lost_error_state:
-                if _mqtt_cnx_lost_reconnect_state:
-                    _script_loader.setState(_mqtt_cnx_lost_reconnect_state)
-            subscribe_mqtt_topics()
-            _core_state = _CORE_MQTT_LOOP
-        elif _core_state == _CORE_MQTT_FAILED:
-            display_wifi_icon(False)
-            if _mqtt_cnx_lost_error_state:
-                _script_loader.setState(_mqtt_cnx_lost_error_state)
-            if _mqtt is None:
-                init_mqtt()
-            else:
-                mqtt_reconnect()
-        elif _core_state == _CORE_MQTT_RECONNECTED:
-            display_wifi_icon(True)
-            if _mqtt_cnx_lost_reconnect_state:
-                _script_loader.setState(_mqtt_cnx_lost_reconnect_state)
-            _core_state = _CORE_MQTT_LOOP
-        elif _core_state == _CORE_MQTT_LOOP:
-            # The MQTT library loop takes exactly 1 or 2 seconds to complete
-            mqtt_loop()
-            # Process any pending script received by _mqtt_on_message()
-            if _mqtt_pending_script is not None:
-                print("@@ Loop: Process new pending script")
-                if _script_loader.newScript(script=_mqtt_pending_script, saveToNVM=True):
-                    update_script_settings()
-                    compute_mqtt_topics()
-                    subscribe_mqtt_topics()
-                _mqtt_pending_script = None
-                gc.collect()
-            if start_ts > _next_wifi_hb_ts:
-                ga4_mk_event(category="wifi", action="hb", value=wifi_rssi())
-                _next_wifi_hb_ts = start_ts + _GA4_WIFI_HB_SEC
-            ga4_process_queue()
+        # Single C time call per iteration; every consumer below takes it
+        # as a parameter instead of re-fetching.
+        now_ns = _mono_ns()
+        # The error blink owns the LED while active; the regular heartbeat
+        # blink resumes once it expires or the boot button clears it.
+        if _err_code is None:
+            blink_led(now_ns)
+        else:
+            blink_led_error_tick(now_ns)
+
+        # Handle core state: one tuple-indexed dispatch instead of the
+        # 8-way elif ladder. Read the state global once per pass.
+        cs = _core_state
+        _CORE_HANDLERS[cs](now_ns)
+        if cs == _CORE_MQTT_LOOP and _mqtt_pending_script is not None:
+            # Process any pending script received by _mqtt_on_message().
+            # This runs at the top level of the loop (not inside the state
+            # handler): script parsing is the deepest call chain in the
+            # program and the 16-deep pystack is the limit.
+            print("@@ Loop: Process new pending script")
+            if _script_loader.newScript(script=_mqtt_pending_script, saveToNVM=True):
+                update_script_settings()
+                compute_mqtt_topics()
+                subscribe_mqtt_topics()
+            _mqtt_pending_script = None
+            gc.collect()
         if _old_cs != _core_state:
-            print("@@ CORE STATE:", _old_cs, "=>", _core_state)
+            _logger.info("@@ CORE STATE: %s => %s", _old_cs, _core_state)
             _old_cs = _core_state
 
-        blink_wifi()
-        _matrix.display.refresh(minimum_frames_per_second=0)
-        _script_loader.updateDisplay()
-        end_ts = time.monotonic()
-        delta_ts = end_ts - start_ts
-        if delta_ts < 1: time.sleep(0.25)  # prevent busy loop
-        print("@@ loop", _core_state, ":", delta_ts, "s", wifi_rssi(), "dBm")
+        # Only push a frame when something actually changed: a toggled wifi
+        # icon, a state/blocks change applied by updateDisplay(), or a
+        # one-shot event (icon re-layout, boot) flagged via _display_dirty.
+        # updateDisplay() runs before refresh() so a change shows up in the
+        # same pass instead of waiting for the next one.
+        # blink_wifi() is only entered when its precomputed deadline has
+        # passed; most iterations skip the call entirely.
+        icon_toggled = False
+        if _wifi_icon_state is not None and now_ns > _next_blink_wifi_ns:
+            icon_toggled = blink_wifi(now_ns)
+        if _update_display() or icon_toggled or _display_dirty:
+            _display_dirty = False
+            _refresh(**_refresh_kw)
+        delta_ns = _mono_ns() - now_ns
+        # Idle pacing to prevent a busy loop: wake at the earliest timer
+        # that needs service (LED heartbeat or error toggle, wifi icon
+        # blink), still capped by the fixed 250 ms tick budget minus the
+        # work already done, so the loop period never exceeds the tick.
+        # While MQTT is looping, a long enough idle wait is spent inside
+        # _mqtt.loop() instead of time.sleep(): broker traffic is then
+        # processed the moment it arrives rather than after the pause.
+        # alarm.light_sleep_until_alarms() would cut power draw further, but
+        # light sleep stops the RGBMatrix scanout and visibly blanks the
+        # panel, so a plain short sleep it is.
+        # Skip the pause entirely when a script is waiting to be parsed.
+        if _mqtt_pending_script is None:
+            if _err_code is None:
+                wake_ns = _last_blink_led_ns + 1_000_000_000
+            else:
+                wake_ns = _err_next_toggle_ns
+            if _wifi_icon_state is not None and _next_blink_wifi_ns < wake_ns:
+                wake_ns = _next_blink_wifi_ns
+            idle_ns = wake_ns - now_ns
+            budget_ns = 250_000_000 - delta_ns
+            if idle_ns > budget_ns:
+                idle_ns = budget_ns
+            if idle_ns > 0:
+                # MiniMQTT rejects timeouts below its socket_timeout, so
+                # short waits fall back to a plain sleep.
+                if _core_state == _CORE_MQTT_LOOP and idle_ns >= 100_000_000:
+                    mqtt_loop(idle_ns * 1e-9)
+                else:
+                    _sleep(idle_ns * 1e-9)
+        if _logger.getEffectiveLevel() <= logging.DEBUG:
+            print("@@ loop", _core_state, ":", delta_ns // 1_000_000, "ms", wifi_rssi(), "dBm")
 
 #~~
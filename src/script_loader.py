@@ -11,6 +11,25 @@ import time
 from script_parser import ScriptParser
 
 
+def _xor8(data) -> int:
+    # 8-bit XOR checksum folded through 8-byte integer chunks: the
+    # int.from_bytes + XOR work runs in C, so a multi-hundred-byte script
+    # costs n/8 VM iterations instead of one bytecode dispatch per byte.
+    mv = memoryview(data)
+    n = len(mv) & ~7
+    acc = 0
+    for i in range(0, n, 8):
+        acc ^= int.from_bytes(mv[i:i + 8], "little")
+    # Fold the wide accumulator down to a single byte.
+    acc ^= acc >> 32
+    acc ^= acc >> 16
+    acc ^= acc >> 8
+    crc = acc & 0xFF
+    for i in range(n, len(mv)):
+        crc ^= mv[i]
+    return crc
+
+
 class ScriptLoader:
     def __init__(self, parser: ScriptParser):
         self._parser = parser
@@ -21,14 +40,17 @@ class ScriptLoader:
 
     def newScript(self, script: str, saveToNVM:bool) -> bool:
         # Return true if the script has changed.
-        script_hash = self._scriptHash(script)
+        # Encode once: the hash and the NVM save both want the UTF-8 bytes,
+        # and a retransmit of the same script costs exactly one encode+hash.
+        script_b = script.encode()
+        script_hash = self._scriptHash(script_b)
         if script_hash != self._script_hash:
             start_ts = time.monotonic()
             self._parser.parseJson(script)
             parse_s = time.monotonic() - start_ts
             if saveToNVM:
                 start_ts = time.monotonic()
-                saved = self._saveToNVM(script)
+                saved = self._saveToNVM(script_b)
                 save_s = time.monotonic() - start_ts
                 print("@@ NewScript:", parse_s, "s parsing,", save_s, "s save to NVM.")
             else:
@@ -52,38 +74,38 @@ class ScriptLoader:
             print("@@ blocks: ", repr(self._active_blocks))
             self._changed = True
 
-    def updateDisplay(self) -> None:
+    def updateDisplay(self) -> bool:
+        # Return true if the displayed groups were actually updated, so the
+        # caller can decide whether a display refresh is warranted.
         if self._changed:
             self._parser.updateRoot(self._active_state, self._active_blocks)
             self._changed = False
+            return True
+        return False
 
-    def _scriptHash(self, script) -> str:
+    def _scriptHash(self, script_b) -> bytes:
         m = adafruit_hashlib.sha1()
-        m.update(script.encode())
-        return m.hexdigest()
+        m.update(script_b)
+        # The 20-byte digest is only ever compared, never printed; it is
+        # half the size of the hex string and skips the hexlify pass.
+        return m.digest()
 
-    def _saveToNVM(self, script) -> bool:
+    def _saveToNVM(self, script_b) -> bool:
         try:
             # Header format: 8-byte header with
             # "DTSG" prefix + CRC head + CRC script + 2 bytes str length
             # followed by the script string in UTF-8.
             #              ppppCCLL
             b = bytearray("DTSG0011".encode())
-            s = script.encode()
+            s = script_b
 
             # Fixed header
             struct.pack_into("!H", b, 6, len(s))
-            crc_fix = 0
-            for i in b:
-                crc_fix = crc_fix ^ i
-            b[4] = crc_fix
+            b[4] = _xor8(b)
 
             # Variable payload
             b.extend(s)
-            crc_var = 0
-            for i in s:
-                crc_var = crc_var ^ i
-            b[5] = crc_var
+            b[5] = _xor8(s)
 
             print("@@ Write NVM:", len(b), "bytes")
             microcontroller.nvm[0 : len(b)] = b
@@ -113,19 +135,14 @@ class ScriptLoader:
             fixed[4] = 0
             fixed[5] = 0
 
-            crc_f = 0
-            for i in fixed:
-                crc_f = crc_f ^ i
+            crc_f = _xor8(fixed)
             if fixed[0:4].decode() != "DTSG" or crc_fix != crc_f:
                 print("@@ Read NVM: invalid Header/CRC", crc_fix, "in", fixed.hex())
                 return None
 
             slen = struct.unpack_from("!H", fixed, 6)[0]
             s = microcontroller.nvm[8 : 8 + slen]
-            crc_s = 0
-            for i in s:
-                crc_s = crc_s ^ i
-
+            crc_s = _xor8(s)
             if crc_s != crc_var:
                 print("@@ Read NVM: invalid Script CRC", crc_s, "in", fixed.hex(), "+", s.hex())
                 return None
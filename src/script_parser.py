@@ -117,31 +117,53 @@ class Rgb:
         return f"#{self.r:02x}{self.g:02x}{self.b:02x}"
 
 class ScriptParser:
-    def __init__(self, sx: int, sy: int, fonts):
+    def __init__(self, sx: int, sy: int, fonts, bit_depth: int = 8):
         self._sx = sx
         self._sy = sy
         self._root = displayio.Group()
+        # All parsed groups hang off a single swappable content group so
+        # reset() can detach an entire old script in one pop; _root itself
+        # stays stable for the caller that appended it to the display tree.
+        self._content = displayio.Group()
+        self._root.append(self._content)
         self._title = displayio.Group()
         self._blocks = {}
         self._states = {}
         self._fonts = fonts
         self._palettes = {}
         self._settings = {}
-
-    def _clearGroup(self, group) -> None:
-        while group:
-            group.pop()
+        # The matrix only displays the top bit_depth bits of each channel,
+        # so colors are masked to that depth up front: colors that render
+        # identically then share a single cached Palette below.
+        m = (0xFF << (8 - bit_depth)) & 0xFF
+        self._rgb_mask = (m << 16) | (m << 8) | m
+        # LUT from the raw "rgb" script string to its masked packed value.
+        # Scripts reuse the same handful of colors, so this skips the hex
+        # parse and Rgb allocation on every instruction after the first.
+        self._rgb_cache = {}
 
     def reset(self) -> None:
         self._settings.clear()
-        self._clearGroup(self._title)
         self._blocks.clear()
         self._states.clear()
-        self._clearGroup(self._root)
+        # Swap the whole content group out in a single pop instead of
+        # removing dozens of vector shapes one Python-level pop() each;
+        # the old graph is reclaimed in one sweep by the gc.collect()
+        # that follows parsing.
+        if self._root:
+            self._root.pop()
+        self._content = displayio.Group()
+        self._root.append(self._content)
         self._palettes.clear()
 
-    def _getPalette(self, rgb: Rgb):
-        rgb_val = rgb.asHex()
+    def _parseRgb(self, rgb: str) -> int:
+        rgb_val = self._rgb_cache.get(rgb)
+        if rgb_val is None:
+            rgb_val = Rgb(rgb).asHex() & self._rgb_mask
+            self._rgb_cache[rgb] = rgb_val
+        return rgb_val
+
+    def _getPalette(self, rgb_val: int):
         if rgb_val in self._palettes:
             return self._palettes[rgb_val]
         else:
@@ -155,6 +177,21 @@ class ScriptParser:
         if isinstance(s, int):
             res += s
         else:
+            try:
+                # Fast path: most operands are plain integers, and one
+                # C-level int() beats the per-character expression loop.
+                # The range fix is duplicated inline rather than factored
+                # out: this sits on the deepest pystack chain and an extra
+                # call frame is not free here.
+                res += int(s)
+                if sxy > 0:
+                    while res < 0:
+                        res += sxy
+                    while res > sxy:
+                        res -= sxy
+                return res
+            except ValueError:
+                pass
             # We don't have re.split("([+-])", str) on CircuitPython
             op = "+"
             accum = 0
@@ -217,7 +254,7 @@ class ScriptParser:
                 op = instruction["op"]
 
                 if op == "line":
-                    rgb = Rgb(instruction["rgb"])
+                    rgb = self._parseRgb(instruction["rgb"])
                     x1 = self._parseX(instruction["x1"], ofx)
                     y1 = self._parseY(instruction["y1"], ofy)
                     x2 = self._parseX(instruction["x2"], ofx)
@@ -237,7 +274,7 @@ class ScriptParser:
                     destGroup.append(p)
 
                 elif op == "poly":
-                    rgb = Rgb(instruction["rgb"])
+                    rgb = self._parseRgb(instruction["rgb"])
                     ptsOjb = instruction["pts"]
                     pts = []
                     for pt in ptsOjb:
@@ -253,7 +290,7 @@ class ScriptParser:
                     destGroup.append(p)
 
                 elif op == "rect":
-                    rgb = Rgb(instruction["rgb"])
+                    rgb = self._parseRgb(instruction["rgb"])
                     x = self._parseX(instruction["x"], ofx)
                     y = self._parseY(instruction["y"], ofy)
                     w = self._parseX(instruction["w"])
@@ -268,7 +305,7 @@ class ScriptParser:
                     destGroup.append(r)
 
                 elif op == "text":
-                    rgb = Rgb(instruction["rgb"])
+                    rgb = self._parseRgb(instruction["rgb"])
                     x = self._parseX(instruction["x"], ofx)
                     y = self._parseY(instruction["y"], ofy)
                     txt = str(instruction["t"])
@@ -280,7 +317,7 @@ class ScriptParser:
                     t.y = y + FONT_Y_OFFSET * scale
                     t.scale = scale
                     t.text = txt
-                    t.color = rgb.asHex()
+                    t.color = rgb
                     destGroup.append(t)
 
     def _parseGroup(self, jsonObj, instructions):
@@ -290,16 +327,24 @@ class ScriptParser:
         return group
 
     def parseJson(self, jsonStr:str) -> None:
+        # Reset first so the old group graph is freed before the JSON
+        # tokenizer makes its big transient allocation.
         self.reset()
         gc.collect()
         jsonObj = json.loads(jsonStr)
+        self.parseDict(jsonObj)
 
+    def parseDict(self, jsonObj) -> None:
+        # Entry point for callers that already hold the parsed structure
+        # (e.g. a frozen/pre-built dict), skipping the JSON tokenizer and
+        # its large transient string.
+        self.reset()
         if "settings" in jsonObj:
             self._settings.update(jsonObj["settings"])
 
         if "title" in jsonObj:
             self._title = self._parseGroup(jsonObj, jsonObj["title"])
-            self._root.append(self._title)
+            self._content.append(self._title)
             self._title.hidden = False
 
         if "states" in jsonObj:
@@ -307,7 +352,7 @@ class ScriptParser:
                 insts = jsonObj["states"][state_key]
                 group = self._parseGroup(jsonObj, insts)
                 self._states[state_key] = group
-                self._root.append(group)
+                self._content.append(group)
 
         if "blocks" in jsonObj:
             for block_key in jsonObj["blocks"]:
@@ -317,8 +362,8 @@ class ScriptParser:
                     "inactive": self._parseGroup(jsonObj, b["inactive"]),
                 }
                 self._blocks[block_key] = groups
-                self._root.append(groups["active"])
-                self._root.append(groups["inactive"])
+                self._content.append(groups["active"])
+                self._content.append(groups["inactive"])
         del jsonObj
         gc.collect()
 